@@ -1,4 +1,3 @@
-import os
 import logging
 from package.backupclient import GithubBackupClientAzure
 from package.repoclient import GithubRepoClient
@@ -9,9 +8,6 @@ from package.utils import load_env_vars
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
-def load_env_vars(var_names):
-    return {var: os.getenv(var) for var in var_names}
-
 def main():
     env_vars = load_env_vars([
         'GITHUB_TOKEN',
@@ -32,7 +28,7 @@ def main():
             env_vars['AZURE_STORAGE_ACCOUNT_NAME'], 
             env_vars['AZURE_STORAGE_CONTAINER_NAME']
         )
-        backup.create_gh_backup()
+        backup.create_gh_backup_sync()
         logging.info("Backup process completed.")
     except Exception as e:
         logging.error(f"An error occurred while creating backups: {e}")
@@ -88,7 +84,7 @@ def main():
     try:
         logging.info("Starting repository creation process...")
         github_client = GithubRepoClient(env_vars['GITHUB_TOKEN'])
-        github_client.create_repos(
+        github_client.create_repos_sync(
             env_vars['ORG_OR_USER'],
             repositories,
             branch_protection_payload
@@ -100,7 +96,7 @@ def main():
 
     try:
         logging.info("Starting environment creation process...")
-        github_client.create_envs(
+        github_client.create_envs_sync(
             env_vars['ORG_OR_USER'], 
             repositories
         )
@@ -112,8 +108,8 @@ def main():
     try:
         logging.info("Starting secrets creation process...")
         secrets_client = GithubSecretsClient(env_vars['GITHUB_TOKEN'], env_vars['ORG_OR_USER'])
-        secrets_client.add_secrets_to_repos(repositories)
-        secrets_client.add_secrets_to_envs(repositories)
+        secrets_client.add_secrets_to_repos_sync(repositories)
+        secrets_client.add_secrets_to_envs_sync(repositories)
         logging.info("Secrets creation process completed.")
     except Exception as e:
         logging.error(f"An error occurred while creating secrets: {e}")
@@ -150,10 +146,10 @@ def main():
         ]
     }
 
-    team_client = GithubTeamClient(env_vars['GITHUB_TOKEN'])
     try:
+        team_client = GithubTeamClient(env_vars['GITHUB_TOKEN'])
         logging.info("Starting team creation process...")
-        team_client.create_teams(env_vars['ORG_OR_USER'], teams_data)
+        team_client.create_teams_sync(env_vars['ORG_OR_USER'], teams_data)
         logging.info("Team creation process completed.")
     except Exception as e:
         logging.error(f"An error occurred while creating teams: {e}")
@@ -162,14 +158,14 @@ def main():
     # Requires Team-Synchronization to be configured.
     try:
         logging.info("Starting team association process...")
-        team_client.associate_teams_idp(env_vars['ORG_OR_USER'], teams_data)
+        team_client.associate_teams_idp_sync(env_vars['ORG_OR_USER'], teams_data)
         logging.info("Team association process completed.")
     except Exception as e:
         logging.error(f"An error occurred while associating teams: {e}")
 
     try:
         logging.info("Starting repository to team addition process...")
-        team_client.add_repos_to_teams(env_vars['ORG_OR_USER'], teams_data)
+        team_client.add_repos_to_teams_sync(env_vars['ORG_OR_USER'], teams_data)
         logging.info("Repository to team addition process completed.")
     except Exception as e:
         logging.error(f"An error occurred while adding repositories to teams: {e}")
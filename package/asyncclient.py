@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import random
+import time
+import httpx
+from .utils import json_dumps, json_loads
+
+BASE_URL = "https://api.github.com"
+# Maximum number of requests in flight at the same time, to stay clear of GitHub's secondary rate limits
+MAX_CONCURRENT_REQUESTS = 64
+LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=MAX_CONCURRENT_REQUESTS)
+TIMEOUT = 30
+# Pause a token until its rate limit resets once fewer requests than this remain
+RATE_LIMIT_THRESHOLD = 10
+# Number of times a rate limited or failed request is retried
+MAX_RETRIES = 5
+# Server errors that idempotent requests are retried on, with exponential backoff from RETRY_BACKOFF seconds
+RETRY_STATUSES = (502, 503, 504)
+RETRY_BACKOFF = 0.5
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+# Maximum number of aliased fields in a single GraphQL query or mutation
+GRAPHQL_BATCH_SIZE = 50
+
+AsyncClient = None
+_semaphore = None
+# (Authorization header, rate limit resource) -> epoch time at which its rate limit resets
+_rate_limit_resets = {}
+
+def get_client():
+    """
+    Get the shared AsyncClient, creating it if it does not exist yet.
+
+    Returns:
+    httpx.AsyncClient: The client shared by all GitHub API calls.
+    """
+    global AsyncClient, _semaphore
+    if AsyncClient is None or AsyncClient.is_closed:
+        AsyncClient = httpx.AsyncClient(base_url=BASE_URL, http2=True, limits=LIMITS, timeout=TIMEOUT)
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return AsyncClient
+
+async def close_client():
+    """
+    Close the shared AsyncClient and release its connections.
+    """
+    global AsyncClient, _semaphore
+    if AsyncClient is not None:
+        await AsyncClient.aclose()
+        AsyncClient = None
+        _semaphore = None
+
+async def request(method, url, status_only=(), **kwargs):
+    """
+    Send a request to the GitHub API using the shared AsyncClient.
+
+    At most MAX_CONCURRENT_REQUESTS requests are in flight at once. Requests are
+    held back while the rate limit of their token is nearly used up. Requests
+    rejected by the primary or secondary rate limit, and idempotent requests that
+    hit a transient server error, are retried with backoff. A json body is
+    serialized once with json_dumps, which uses orjson when it is installed.
+
+    The headers may be given as a function of the rate limit resource, which is
+    called again for every attempt. A request whose token runs out of rate limit
+    is then retried right away if the headers it returns next carry another token.
+
+    Parameters:
+    method (str): The HTTP method.
+    url (str): The URL to send the request to.
+    status_only (tuple, optional): Status codes for which only the status is needed. The
+    body of such a response is closed without being read or decoded. Defaults to ().
+    **kwargs: Additional arguments passed on to httpx.
+
+    Returns:
+    httpx.Response: The response.
+    """
+    headers_for = kwargs.pop("headers", None)
+    rotating = callable(headers_for)
+    if not rotating:
+        headers_for = lambda resource, headers=headers_for: headers
+    content_type = None
+    if "json" in kwargs:
+        kwargs["content"] = json_dumps(kwargs.pop("json"))
+        content_type = "application/json"
+    resource = rate_limit_resource(url)
+
+    def build_headers():
+        headers = httpx.Headers(headers_for(resource))
+        if content_type is not None:
+            headers["Content-Type"] = content_type
+        return headers
+
+    next_headers = None
+    for attempt in range(MAX_RETRIES + 1):
+        headers = next_headers if next_headers is not None else build_headers()
+        next_headers = None
+        token = headers.get("Authorization")
+        await wait_for_rate_limit(token, resource)
+        client = get_client()
+        async with _semaphore:
+            response = await client.send(client.build_request(method, url, headers=headers, **kwargs), stream=True)
+            if response.status_code in status_only:
+                await response.aclose()
+            else:
+                await response.aread()
+        record_rate_limit(token, response, resource)
+
+        delay = retry_delay(method, response, attempt)
+        if delay is None or attempt == MAX_RETRIES:
+            return response
+        if rotating and is_rate_limited(token, resource):
+            next_headers = build_headers()
+            if next_headers.get("Authorization") != token:
+                logging.warning(f"{method} {url} failed with status code {response.status_code}. Retrying with another token.")
+                continue
+        logging.warning(f"{method} {url} failed with status code {response.status_code}. Retrying in {delay:.1f} seconds.")
+        await asyncio.sleep(delay)
+
+async def gather_limited(coros, limit):
+    """
+    Run coroutines concurrently with at most a given number of them running at once.
+
+    Parameters:
+    coros (list): The coroutines to run.
+    limit (int): The maximum number of coroutines running at the same time.
+
+    Returns:
+    list: The results of the coroutines, in order.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*[run(coro) for coro in coros])
+
+async def graphql(query, variables=None, **kwargs):
+    """
+    Send a query or mutation to the GitHub GraphQL API using the shared AsyncClient.
+
+    Parameters:
+    query (str): The GraphQL query or mutation.
+    variables (dict, optional): The variables of the query. Defaults to None.
+    **kwargs: Additional arguments passed on to httpx.
+
+    Returns:
+    dict: The data of the response, or None if the request failed. Fields that
+    could not be resolved are None in the returned data.
+    """
+    response = await request("POST", "/graphql", json={"query": query, "variables": variables or {}}, **kwargs)
+    if response.status_code != 200:
+        logging.error(f"GraphQL request failed. Status code: {response.status_code}")
+        logging.error(response.text)
+        return None
+    result = json_loads(response.content)
+    if result.get("data") is None:
+        logging.error(f"GraphQL request failed. Errors: {result.get('errors')}")
+    return result.get("data")
+
+async def get_repositories(owner, repo_names, fields, **kwargs):
+    """
+    Look up several repositories of an owner using aliased GraphQL queries, with up to
+    GRAPHQL_BATCH_SIZE repositories per query. The queries are sent concurrently.
+
+    Parameters:
+    owner (str): The name of the organization or user owning the repositories.
+    repo_names (list): The names of the repositories.
+    fields (str): The fields selected on each repository, for example "id databaseId".
+    **kwargs: Additional arguments passed on to httpx.
+
+    Returns:
+    dict: The selected fields of each repository that was found, keyed by its name.
+    Repositories that could not be resolved are left out.
+    """
+    repo_names = list(dict.fromkeys(repo_names))
+    batches = [repo_names[start:start + GRAPHQL_BATCH_SIZE] for start in range(0, len(repo_names), GRAPHQL_BATCH_SIZE)]
+
+    async def lookup(batch):
+        arguments = "".join(f", $n{i}: String!" for i in range(len(batch)))
+        aliases = " ".join(f"r{i}: repository(owner: $owner, name: $n{i}) {{ {fields} }}" for i in range(len(batch)))
+        variables = {"owner": owner, **{f"n{i}": repo_name for i, repo_name in enumerate(batch)}}
+        return await graphql(f"query($owner: String!{arguments}) {{ {aliases} }}", variables, **kwargs)
+
+    repositories = {}
+    for batch, data in zip(batches, await asyncio.gather(*[lookup(batch) for batch in batches])):
+        if data is None:
+            continue
+        for i, repo_name in enumerate(batch):
+            if data.get(f"r{i}") is not None:
+                repositories[repo_name] = data[f"r{i}"]
+    return repositories
+
+def stream(method, url, **kwargs):
+    """
+    Stream a response from the GitHub API using the shared AsyncClient.
+
+    Parameters:
+    method (str): The HTTP method.
+    url (str): The URL to send the request to.
+    **kwargs: Additional arguments passed on to httpx.
+
+    Returns:
+    An async context manager yielding the httpx.Response.
+    """
+    return get_client().stream(method, url, **kwargs)
+
+def rate_limit_resource(url):
+    """
+    Get the GitHub rate limit resource a request counts against. The GraphQL API
+    has a budget of its own, separate from the REST API's "core" budget.
+
+    Parameters:
+    url (str): The URL of the request.
+
+    Returns:
+    str: The name of the rate limit resource.
+    """
+    return "graphql" if str(url).rstrip("/").endswith("/graphql") else "core"
+
+async def wait_for_rate_limit(token, resource="core"):
+    """
+    Sleep until the rate limit of a token resets if it is nearly used up.
+
+    Parameters:
+    token (str): The Authorization header of the request.
+    resource (str, optional): The rate limit resource. Defaults to "core".
+    """
+    reset = _rate_limit_resets.get((token, resource))
+    if reset is not None and reset > time.time():
+        await asyncio.sleep(reset - time.time())
+
+def is_rate_limited(token, resource="core"):
+    """
+    Check whether the rate limit of a token is nearly used up.
+
+    Parameters:
+    token (str): The Authorization header of the request.
+    resource (str, optional): The rate limit resource. Defaults to "core".
+
+    Returns:
+    bool: True if requests with the token are held back until its rate limit resets.
+    """
+    reset = _rate_limit_resets.get((token, resource))
+    return reset is not None and reset > time.time()
+
+def record_rate_limit(token, response, resource="core"):
+    """
+    Record the remaining rate limit of a token from the X-RateLimit headers of a response.
+
+    Parameters:
+    token (str): The Authorization header of the request.
+    response (httpx.Response): The response.
+    resource (str, optional): The rate limit resource, used if the response does not name one. Defaults to "core".
+    """
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    reset = response.headers.get("X-RateLimit-Reset")
+    if remaining is None or reset is None:
+        return
+    key = (token, response.headers.get("X-RateLimit-Resource", resource))
+    if int(remaining) < RATE_LIMIT_THRESHOLD:
+        _rate_limit_resets[key] = int(reset)
+    else:
+        _rate_limit_resets.pop(key, None)
+
+def retry_delay(method, response, attempt):
+    """
+    Get the number of seconds to wait before retrying a rate limited or failed request.
+
+    Parameters:
+    method (str): The HTTP method.
+    response (httpx.Response): The response.
+    attempt (int): The number of retries made so far.
+
+    Returns:
+    float: The delay, or None if the request should not be retried.
+    """
+    if response.status_code in RETRY_STATUSES and method.upper() in IDEMPOTENT_METHODS:
+        return RETRY_BACKOFF * 2 ** attempt
+    if response.status_code not in (403, 429):
+        return None
+    jitter = random.uniform(0, 2 ** attempt)
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        return float(retry_after) + jitter
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        return max(0, int(response.headers["X-RateLimit-Reset"]) - time.time()) + jitter
+    if response.status_code == 429:
+        return jitter
+    return None
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    The shared AsyncClient is bound to the event loop it was used on, so it is
+    closed before the loop is torn down.
+
+    Parameters:
+    coro (coroutine): The coroutine to run.
+
+    Returns:
+    The result of the coroutine.
+    """
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close_client()
+    return asyncio.run(main())
@@ -1,11 +1,20 @@
-import requests
+import asyncio
 import os
 import logging
 from azure.storage.blob import BlobServiceClient
 from azure.identity import DefaultAzureCredential
-import time
+from package.asyncclient import request, run_sync, stream
 from package.repoclient import GithubRepoClient
-from .utils import get_headers
+from .utils import get_headers, json_loads
+
+# Size of the chunks the migration archive is written to disk in
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Number of blocks uploaded to Azure Blob Storage at the same time
+UPLOAD_MAX_CONCURRENCY = 8
+# Seconds between migration status checks, growing by POLL_BACKOFF up to POLL_MAX_DELAY
+POLL_INITIAL_DELAY = 5.0
+POLL_BACKOFF = 1.5
+POLL_MAX_DELAY = 30.0
 
 class GithubBackupClientAzure:
     """
@@ -16,7 +25,7 @@ class GithubBackupClientAzure:
         org_or_user (str): The name of the GitHub organization or user account.
         account_name (str): The name of the Azure storage account.
         container_name (str): The name of the Azure Blob Storage container.
-        headers (dict): The headers used for GitHub API requests.
+        headers (httpx.Headers): The headers used for GitHub API requests.
         github_client (GithubRepoClient): The client used for GitHub API requests.
     """
 
@@ -25,8 +34,8 @@ class GithubBackupClientAzure:
         self.org_or_user = org_or_user
         self.account_name = account_name
         self.container_name = container_name
-        self.headers = self.get_headers()
         self.github_client = GithubRepoClient(github_token)
+        self.headers = self.github_client.headers
         """
         Initializes a new instance of the GithubBackupClientAzure class.
 
@@ -45,16 +54,22 @@ class GithubBackupClientAzure:
         """
         return get_headers(self.github_token)
 
-    def get_existing_repositories(self):
+    async def get_existing_repositories(self):
         """
         Returns a list of all existing repositories in the GitHub organization or user account.
 
         Returns:
-            list: A list of repository names.
+            frozenset: The repository names.
         """
-        return self.github_client.get_existing_repositories(self.org_or_user)
+        return await self.github_client.get_cached_repositories(self.org_or_user)
 
-    def download_migration_archive(self, migration_id):
+    def get_existing_repositories_sync(self):
+        """
+        Synchronous wrapper around get_existing_repositories.
+        """
+        return run_sync(self.get_existing_repositories())
+
+    async def download_migration_archive(self, migration_id):
         """
         Downloads the migration archive for a given migration ID.
 
@@ -64,19 +79,22 @@ class GithubBackupClientAzure:
         Returns:
             str: The file path of the downloaded migration archive. Returns None if the download failed.
         """
-        base_url = f"https://api.github.com/orgs/{self.org_or_user}/migrations/{migration_id}/archive"
+        base_url = f"/orgs/{self.org_or_user}/migrations/{migration_id}/archive"
         headers = self.headers
 
-        response = requests.get(base_url, headers=headers)
-        if response.status_code == 200:
-            file_path = f"migration_archive_{migration_id}.zip"
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
-            logging.info(f"Migration archive downloaded and saved to {file_path}")
-            return file_path  # Return the file path
-        else:
-            logging.error(f"Failed to download migration archive. Status code: {response.status_code}")
-            return None
+        # Stream the archive to disk so it is never held in memory as a whole
+        # GitHub redirects to the storage location of the archive
+        async with stream("GET", base_url, headers=headers, follow_redirects=True) as response:
+            if response.status_code == 200:
+                file_path = f"migration_archive_{migration_id}.zip"
+                with open(file_path, 'wb') as f:
+                    async for chunk in response.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        await asyncio.to_thread(f.write, chunk)
+                logging.info(f"Migration archive downloaded and saved to {file_path}")
+                return file_path  # Return the file path
+            else:
+                logging.error(f"Failed to download migration archive. Status code: {response.status_code}")
+                return None
 
     def upload_to_azure_blob_storage(self, file_path):
         """
@@ -94,7 +112,9 @@ class GithubBackupClientAzure:
         # Create BlobServiceClient instance
         blob_service_client = BlobServiceClient(
             account_url=f"https://{self.account_name}.blob.core.windows.net",
-            credential=credential
+            credential=credential,
+            connection_timeout=60,
+            read_timeout=300
         )
 
         # Extract blob name from file path
@@ -107,62 +127,91 @@ class GithubBackupClientAzure:
         # Get BlobClient instance
         blob_client = blob_service_client.get_blob_client(container=self.container_name, blob=blob_name)
 
-        # Upload blob
+        # Upload blob as blocks staged in parallel
         with open(file_path, "rb") as data:
-            blob_client.upload_blob(data)
+            blob_client.upload_blob(data, blob_type="BlockBlob", overwrite=True, max_concurrency=UPLOAD_MAX_CONCURRENCY)
 
         logging.info("Migration archive uploaded to Azure Blob Storage.")
 
-    def wait_and_upload(self, migration_id):
+    async def wait_and_upload(self, migration_id):
         """
         Waits for a migration to complete and then uploads the migration archive to Azure Blob Storage.
 
+        The migration status is polled with an exponentially growing delay, so small
+        migrations are picked up quickly while large ones use few requests.
+        Polls send the ETag of the previous response, and unchanged statuses are answered
+        with a 304 which does not count against the rate limit.
+
         Args:
             migration_id (str): The ID of the migration.
         """
-        base_url = f"https://api.github.com/orgs/{self.org_or_user}/migrations/{migration_id}"
+        base_url = f"/orgs/{self.org_or_user}/migrations/{migration_id}"
         headers = self.headers
+        delay = POLL_INITIAL_DELAY
+        etag = None
 
-        # Polling the migration status until it's completed
+        # Polling the migration status until it's completed. Conditional requests are
+        # used so that unchanged statuses don't count against the rate limit.
         while True:
-            response = requests.get(base_url, headers=headers)
+            if etag:
+                headers = self.headers.copy()
+                headers["If-None-Match"] = etag
+            response = await request("GET", base_url, headers=headers)
             if response.status_code == 200:
-                status = response.json()["state"]
+                etag = response.headers.get("ETag")
+                status = json_loads(response.content)["state"]
                 if status == "exported":
-                    file_path = self.download_migration_archive(migration_id)
-                    if file_path:
-                        self.upload_to_azure_blob_storage(file_path)
+                    await self.download_and_upload(migration_id)
                     break
                 elif status == "failed":
                     logging.error("Migration failed.")
                     break
-                else:
-                    logging.info(f"Migration status: {status}. Waiting...")
-                    time.sleep(5) 
-            else:
+            elif response.status_code != 304:
                 logging.error(f"Failed to check migration status. Status code: {response.status_code}")
                 break
 
-    def create_gh_backup(self):
+            logging.info(f"Migration status: {status}. Waiting {delay:.0f} seconds...")
+            await asyncio.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
+    async def download_and_upload(self, migration_id):
+        """
+        Downloads the migration archive for a given migration ID and uploads it to Azure Blob Storage.
+
+        Args:
+            migration_id (str): The ID of the migration.
+        """
+        file_path = await self.download_migration_archive(migration_id)
+        if file_path:
+            # The Azure SDK client is blocking, so it runs in a worker thread
+            await asyncio.to_thread(self.upload_to_azure_blob_storage, file_path)
+
+    async def create_gh_backup(self):
         """
         Triggers an Organization Migration job to backup all repositories in the GitHub organization and its configuration before uploading it to Azure Blob Storage.
         """
-        existing_repositories = GithubRepoClient.get_existing_repositories(self, self.org_or_user)
+        existing_repositories = await self.get_existing_repositories()
 
 
-        base_url = f"https://api.github.com/orgs/{self.org_or_user}/migrations"
+        base_url = f"/orgs/{self.org_or_user}/migrations"
         headers = self.headers
         payload = {
-            "repositories": existing_repositories,
+            "repositories": sorted(existing_repositories),
             "lock_repositories": False
         }
 
         # Make a POST request to start the migration
-        response = requests.post(base_url, headers=headers, json=payload)
+        response = await request("POST", base_url, headers=headers, json=payload)
 
         if response.status_code == 201:
             logging.info("Migration started successfully.")
-            migration_id = response.json()["id"]
-            self.wait_and_upload(migration_id)
+            migration_id = json_loads(response.content)["id"]
+            await self.wait_and_upload(migration_id)
         else:
-            logging.error("Failed to start migration. Response: %s", response.text)
\ No newline at end of file
+            logging.error("Failed to start migration. Response: %s", response.text)
+
+    def create_gh_backup_sync(self):
+        """
+        Synchronous wrapper around create_gh_backup.
+        """
+        return run_sync(self.create_gh_backup())
\ No newline at end of file
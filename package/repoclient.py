@@ -1,10 +1,20 @@
-import requests
+import asyncio
 import logging
-import json
-from package.utils import get_headers
+import time
+from urllib.parse import parse_qs, urlparse
+import httpx
+from package.asyncclient import request, run_sync
+from package.utils import get_headers, json_dumps, json_loads
 
 logging.basicConfig(level=logging.INFO)
 
+# Number of seconds a fetched set of existing repositories is reused for
+REPO_CACHE_TTL = 60
+# Maximum number of repository listing pages fetched at the same time
+ASYNC_CONCURRENCY = 10
+# Below this many repositories, create_repos checks each one instead of listing the organization
+LIST_THRESHOLD = 20
+
 class GithubRepoClient:
     """
     Initialize the GithubRepoClient with a GitHub token.
@@ -14,40 +24,134 @@ class GithubRepoClient:
     """
     def __init__(self, github_token):
         self.github_token = github_token
-        self.headers = get_headers(self.github_token)
+        self.headers = httpx.Headers(get_headers(self.github_token))
+        self.json_headers = httpx.Headers({**self.headers, "Content-Type": "application/json"})
+        self._repo_set_cache = {}
 
-    def get_existing_repositories(self, org_or_user):
+    async def get_existing_repositories(self, org_or_user):
         """
         Get the existing repositories for a specified organization or user.
+
+        The first page is used to find the number of pages from the Link header,
+        after which the remaining pages are fetched concurrently.
         
         Parameters:
         org_or_user (str): The name of the organization or user.
         
         Returns:
-        list: A list of existing repositories.
+        frozenset: The names of the existing repositories.
         """
-        base_url = f"https://api.github.com/orgs/{org_or_user}/repos"
-        existing_repositories = []
-        page = 1
+        base_url = f"/orgs/{org_or_user}/repos"
         per_page = 100
+        semaphore = asyncio.Semaphore(ASYNC_CONCURRENCY)
 
-        while True:
-            response = requests.get(base_url, headers=self.headers, params={"page": page, "per_page": per_page})
+        async def get_page(page):
+            async with semaphore:
+                response = await request("GET", base_url, headers=self.headers, params={"page": page, "per_page": per_page})
             if response.status_code == 200:
-                repos_on_page = response.json()
-                if not repos_on_page:
-                    break
+                return response
+            logging.error(f"Failed to retrieve existing repositories. Status code: {response.status_code}")
+            return None
 
-                existing_repositories.extend(repo["name"] for repo in repos_on_page)
-                page += 1
-            else:
-                logging.error(f"Failed to retrieve existing repositories. Status code: {response.status_code}")
-                break
+        first_page = await get_page(1)
+        if first_page is None:
+            return frozenset()
+
+        last_page = 1
+        if "last" in first_page.links:
+            last_page = int(parse_qs(urlparse(first_page.links["last"]["url"]).query)["page"][0])
+
+        responses = [first_page] + await asyncio.gather(*[get_page(page) for page in range(2, last_page + 1)])
+        return frozenset(repo["name"] for response in responses if response is not None for repo in json_loads(response.content))
+
+    async def get_cached_repositories(self, org_or_user):
+        """
+        Get the existing repositories for a specified organization or user, reusing
+        the result of a previous lookup if it is less than REPO_CACHE_TTL seconds old.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        
+        Returns:
+        frozenset: The names of the existing repositories.
+        """
+        cached = self._fresh_cached_repositories(org_or_user)
+        if cached is not None:
+            return cached
+        existing_repositories = await self.get_existing_repositories(org_or_user)
+        self._repo_set_cache[org_or_user] = (time.monotonic(), existing_repositories)
         return existing_repositories
 
-    def create_repos(self, org_or_user, repositories, branch_protection_payload=None):
+    def _fresh_cached_repositories(self, org_or_user):
+        """
+        Get the cached repositories for a specified organization or user if they are
+        less than REPO_CACHE_TTL seconds old.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        
+        Returns:
+        frozenset: The names of the existing repositories, or None if there is no fresh cache entry.
+        """
+        cached = self._repo_set_cache.get(org_or_user)
+        if cached is not None and time.monotonic() - cached[0] < REPO_CACHE_TTL:
+            return cached[1]
+        return None
+
+    async def repository_exists(self, org_or_user, repo_name):
+        """
+        Check whether a repository exists.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        repo_name (str): The name of the repository.
+        
+        Returns:
+        bool: True if the repository exists, False otherwise.
+        """
+        response = await request("GET", f"/repos/{org_or_user}/{repo_name}", headers=self.headers, status_only=(200, 404))
+        if response.status_code not in (200, 404):
+            logging.error(f"Failed to check whether repository '{repo_name}' exists. Status code: {response.status_code}")
+        return response.status_code == 200
+
+    async def find_existing_repositories(self, org_or_user, repo_names):
+        """
+        Find which of the given repositories already exist.
+
+        For a handful of repositories, checking each one concurrently takes fewer
+        requests than listing every repository of the organization.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        repo_names (list): The names of the repositories.
+        
+        Returns:
+        frozenset: The names of the given repositories that exist.
+        """
+        cached = self._fresh_cached_repositories(org_or_user)
+        if cached is not None or len(repo_names) >= LIST_THRESHOLD:
+            return await self.get_cached_repositories(org_or_user)
+
+        exists = await asyncio.gather(*[self.repository_exists(org_or_user, repo_name) for repo_name in repo_names])
+        return frozenset(repo_name for repo_name, found in zip(repo_names, exists) if found)
+
+    def _remember_repository(self, org_or_user, repo_name):
+        """
+        Add a newly created repository to the cached set of existing repositories.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        repo_name (str): The name of the repository.
+        """
+        cached = self._repo_set_cache.get(org_or_user)
+        if cached is not None:
+            self._repo_set_cache[org_or_user] = (cached[0], cached[1] | {repo_name})
+
+    async def create_repos(self, org_or_user, repositories, branch_protection_payload=None):
         """
         Create repositories for a specified organization or user.
+
+        The repositories are created concurrently.
         
         Parameters:
         org_or_user (str): The name of the organization or user.
@@ -78,38 +182,73 @@ class GithubRepoClient:
                 "lock_branch": False,
                 "allow_fork_syncing": False
             }
-        base_url = f"https://api.github.com/orgs/{org_or_user}/repos"
-        existing_repositories = self.get_existing_repositories(org_or_user)
+        existing_repositories = await self.find_existing_repositories(org_or_user, [repo['repo_name'] for repo in repositories])
 
-        for repo in repositories:
-            logging.info(repo)
-            repo_name = repo['repo_name']
-            repo_description = repo.get('description', None)
+        # Serialize the branch protection payload once for all repositories
+        branch_protection_body = json_dumps(branch_protection_payload)
 
-            if repo_name in existing_repositories:
-                logging.info(f"Repository '{repo_name}' already exists. Skipping creation.")
-            else:
-                repo_payload = {
-                    "name": repo_name,
-                    "description": repo_description,
-                    "private": True,
-                    "visibility": "private",
-                    "auto_init": repo.get("auto_init", True)
-                }
-
-                response = requests.post(base_url, headers=self.headers, json=repo_payload)
-                if response.status_code == 201:
-                    logging.info(f"Repository '{repo_name}' created successfully.")
-                else:
-                    logging.error(f"Failed to create repository '{repo_name}'. Status code: {response.status_code}")
-                    logging.error(response.text)
-
-                self.enable_vuln_alerts(org_or_user, repo_name)
-                self.enable_automated_fixes(org_or_user, repo_name)
-                if repo.get('branch_protection', True):
-                    self.enable_branch_protection(org_or_user, repo_name, branch_protection_payload)
-
-    def enable_vuln_alerts(self, org_or_user, repo_name):
+        coros = [self._create_one(org_or_user, repo, existing_repositories, branch_protection_body) for repo in repositories]
+        await asyncio.gather(*coros)
+
+    def create_repos_sync(self, *args, **kwargs):
+        """
+        Synchronous wrapper around create_repos.
+        """
+        return run_sync(self.create_repos(*args, **kwargs))
+
+    async def _create_one(self, org_or_user, repo, existing_repositories, branch_protection_body):
+        """
+        Create a single repository and enable its security features and branch protection.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        repo (dict): The repository to be created.
+        existing_repositories (frozenset): The names of the repositories that already exist.
+        branch_protection_body (bytes): The JSON encoded payload for branch protection.
+        """
+        base_url = f"/orgs/{org_or_user}/repos"
+        logging.info(repo)
+        repo_name = repo['repo_name']
+        repo_description = repo.get('description', None)
+
+        if repo_name in existing_repositories:
+            logging.info(f"Repository '{repo_name}' already exists. Skipping creation.")
+            return
+
+        repo_payload = {
+            "name": repo_name,
+            "description": repo_description,
+            "private": True,
+            "visibility": "private",
+            "auto_init": repo.get("auto_init", True)
+        }
+
+        response = await request("POST", base_url, headers=self.headers, json=repo_payload)
+        if response.status_code == 201:
+            logging.info(f"Repository '{repo_name}' created successfully.")
+            self._remember_repository(org_or_user, repo_name)
+        else:
+            logging.error(f"Failed to create repository '{repo_name}'. Status code: {response.status_code}")
+            logging.error(response.text)
+
+        # Automated security fixes depend on vulnerability alerts, so those two run in order.
+        coros = [self._enable_security_features(org_or_user, repo_name)]
+        if repo.get('branch_protection', True):
+            coros.append(self.enable_branch_protection(org_or_user, repo_name, branch_protection_body))
+        await asyncio.gather(*coros)
+
+    async def _enable_security_features(self, org_or_user, repo_name):
+        """
+        Enable vulnerability alerts and then automated fixes for a specified repository.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        repo_name (str): The name of the repository.
+        """
+        await self.enable_vuln_alerts(org_or_user, repo_name)
+        await self.enable_automated_fixes(org_or_user, repo_name)
+
+    async def enable_vuln_alerts(self, org_or_user, repo_name):
         """
         Enable vulnerability alerts for a specified repository.
         
@@ -117,15 +256,15 @@ class GithubRepoClient:
         org_or_user (str): The name of the organization or user.
         repo_name (str): The name of the repository.
         """
-        vuln_alerts_url = f"https://api.github.com/repos/{org_or_user}/{repo_name}/vulnerability-alerts"
-        response = requests.put(vuln_alerts_url, headers=self.headers)
+        vuln_alerts_url = f"/repos/{org_or_user}/{repo_name}/vulnerability-alerts"
+        response = await request("PUT", vuln_alerts_url, headers=self.headers)
         if response.status_code == 204:
             logging.info(f"Vulnerability alerts for '{repo_name}' enabled successfully.")
         else:
             logging.error(f"Failed to enable vulnerability alerts for '{repo_name}'. Status code: {response.status_code}")
             logging.error(response.text)
 
-    def enable_automated_fixes(self, org_or_user, repo_name):
+    async def enable_automated_fixes(self, org_or_user, repo_name):
         """
         Enable automated fixes for a specified repository.
         
@@ -133,59 +272,119 @@ class GithubRepoClient:
         org_or_user (str): The name of the organization or user.
         repo_name (str): The name of the repository.
         """
-        automated_security_fixes_url = f"https://api.github.com/repos/{org_or_user}/{repo_name}/automated-security-fixes"
-        response = requests.put(automated_security_fixes_url, headers=self.headers)
+        automated_security_fixes_url = f"/repos/{org_or_user}/{repo_name}/automated-security-fixes"
+        response = await request("PUT", automated_security_fixes_url, headers=self.headers)
         if response.status_code == 204:
             logging.info(f"Automated security fixes for '{repo_name}' enabled successfully.")
         else:
             logging.error(f"Failed to enable automated security fixes for '{repo_name}'. Status code: {response.status_code}")
             logging.error(response.text)
 
-    def enable_branch_protection(self, org_or_user, repo_name, branch_protection_payload):
+    async def enable_branch_protection(self, org_or_user, repo_name, branch_protection_payload):
         """
         Enable branch protection for a specified repository.
         
         Parameters:
         org_or_user (str): The name of the organization or user.
         repo_name (str): The name of the repository.
-        branch_protection_payload (dict): The payload for branch protection.
+        branch_protection_payload (dict or bytes): The payload for branch protection, optionally already JSON encoded.
         """
-        branch_protection_url = f"https://api.github.com/repos/{org_or_user}/{repo_name}/branches/main/protection"
-        response = requests.put(branch_protection_url, headers=self.headers, json=branch_protection_payload)
+        if isinstance(branch_protection_payload, dict):
+            branch_protection_payload = json_dumps(branch_protection_payload)
+        branch_protection_url = f"/repos/{org_or_user}/{repo_name}/branches/main/protection"
+        response = await request("PUT", branch_protection_url, headers=self.json_headers, content=branch_protection_payload)
         if response.status_code == 200:
             logging.info(f"Branch protection for '{repo_name}' enabled successfully.")
         else:
             logging.error(f"Failed to enable branch protection for '{repo_name}'. Status code: {response.status_code}")
             logging.error(response.text)
 
-    def create_envs(self, org_or_user, repositories):
+    async def create_envs(self, org_or_user, repositories):
         """
         Create environments for a specified organization or user.
+
+        The environments of all repositories are created concurrently. Environments
+        without a deployment branch policy are skipped if they already exist.
         
         Parameters:
         org_or_user (str): The name of the organization or user.
         repositories (list): A list of repositories for which to create environments.
         """
         logging.info("Starting environment creation process...")
-        for repo in repositories:
-            repo_name = repo["repo_name"]
-            environments = repo.get("environments", [])
-
-            for environment in environments:
-                environment_name = environment["environment_name"]
-                protected_branches_only = environment.get("protected_branches_only", False)
-
-                base_url = f"https://api.github.com/repos/{org_or_user}/{repo_name}/environments/{environment_name}"
-                payload = {}
-                if protected_branches_only:
-                    payload["deployment_branch_policy"] = {
-                        "protected_branches": protected_branches_only,
-                        "custom_branch_policies": False
-                    }
-                response = requests.put(base_url, headers=self.headers, json=payload)
-                if response.status_code == 200:
-                    logging.info(f"Environment '{environment_name}' created successfully for repository '{repo_name}'.")
-                else:
-                    logging.error(f"Failed to create environment '{environment_name}' for repository '{repo_name}'. Status code: {response.status_code}")
-                    logging.error(f"Response text: {response.text}")
-        logging.info("Environment creation process completed.")
\ No newline at end of file
+        coros = [self._create_repo_envs(org_or_user, repo) for repo in repositories]
+        await asyncio.gather(*coros)
+        logging.info("Environment creation process completed.")
+
+    async def _create_repo_envs(self, org_or_user, repo):
+        """
+        Create the environments of a single repository.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        repo (dict): The repository for which to create environments.
+        """
+        repo_name = repo["repo_name"]
+        environments = repo.get("environments", [])
+
+        existing_environments = frozenset()
+        if any(not environment.get("protected_branches_only", False) for environment in environments):
+            existing_environments = await self.get_existing_environments(org_or_user, repo_name)
+
+        coros = []
+        for environment in environments:
+            environment_name = environment["environment_name"]
+            if environment_name in existing_environments and not environment.get("protected_branches_only", False):
+                logging.info(f"Environment '{environment_name}' already exists for repository '{repo_name}'. Skipping creation.")
+            else:
+                coros.append(self.create_env(org_or_user, repo_name, environment))
+        await asyncio.gather(*coros)
+
+    async def get_existing_environments(self, org_or_user, repo_name):
+        """
+        Get the existing environments of a specified repository.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        repo_name (str): The name of the repository.
+        
+        Returns:
+        frozenset: The names of the existing environments.
+        """
+        response = await request("GET", f"/repos/{org_or_user}/{repo_name}/environments", headers=self.headers, params={"per_page": 100})
+        if response.status_code == 200:
+            return frozenset(environment["name"] for environment in json_loads(response.content)["environments"])
+        if response.status_code != 404:
+            logging.error(f"Failed to retrieve existing environments for repository '{repo_name}'. Status code: {response.status_code}")
+        return frozenset()
+
+    def create_envs_sync(self, *args, **kwargs):
+        """
+        Synchronous wrapper around create_envs.
+        """
+        return run_sync(self.create_envs(*args, **kwargs))
+
+    async def create_env(self, org_or_user, repo_name, environment):
+        """
+        Create a single environment for a specified repository.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        repo_name (str): The name of the repository.
+        environment (dict): The environment to be created.
+        """
+        environment_name = environment["environment_name"]
+        protected_branches_only = environment.get("protected_branches_only", False)
+
+        base_url = f"/repos/{org_or_user}/{repo_name}/environments/{environment_name}"
+        payload = {}
+        if protected_branches_only:
+            payload["deployment_branch_policy"] = {
+                "protected_branches": protected_branches_only,
+                "custom_branch_policies": False
+            }
+        response = await request("PUT", base_url, headers=self.headers, json=payload)
+        if response.status_code == 200:
+            logging.info(f"Environment '{environment_name}' created successfully for repository '{repo_name}'.")
+        else:
+            logging.error(f"Failed to create environment '{environment_name}' for repository '{repo_name}'. Status code: {response.status_code}")
+            logging.error(f"Response text: {response.text}")
\ No newline at end of file
@@ -1,10 +1,11 @@
-import requests
+import asyncio
 import os
-import json
 from base64 import b64encode
 from nacl import encoding, public
+import httpx
 import logging
-from .utils import get_headers
+from .asyncclient import get_repositories, request, run_sync
+from .utils import get_headers, json_loads
 
 logging.basicConfig(level=logging.INFO)
 
@@ -20,14 +21,16 @@ class GithubSecretsClient:
         self.github_token = github_token
         self.org_or_user = org_or_user
         self.headers = self.get_headers()
+        self._repo_id = {}
 
     def get_headers(self):
-        return get_headers(self.github_token)
+        return httpx.Headers(get_headers(self.github_token))
 
 
-    def get_repository_details(self, repo_name):
+    async def get_repository_details(self, repo_name):
         """
         Get the details of a repository. Used to retrieve the public key.
+        The ID of each repository is only looked up once.
 
         Parameters:
         repo_name (str): The name of the repository.
@@ -38,15 +41,35 @@ class GithubSecretsClient:
         Raises:
         ValueError: If the repository details cannot be retrieved.
         """
-        base_url = f"https://api.github.com/repos/{self.org_or_user}/{repo_name}"
-        response = requests.get(base_url, headers=self.headers)
+        if repo_name in self._repo_id:
+            return self._repo_id[repo_name]
+        base_url = f"/repos/{self.org_or_user}/{repo_name}"
+        response = await request("GET", base_url, headers=self.headers)
         if response.status_code == 200:
-            repository_data = json.loads(response.content)
+            repository_data = json_loads(response.content)
+            self._repo_id[repo_name] = repository_data["id"]
             return repository_data["id"]
         else:
             raise ValueError(f"Failed to get repository details for repository '{repo_name}'. Status code: {response.status_code}")
 
-    def get_public_key(self, url):
+    async def get_repository_ids(self, repo_names):
+        """
+        Look up the IDs of several repositories with batched GraphQL queries.
+        Repositories that could not be resolved are left for get_repository_details
+        to look up over REST.
+
+        Parameters:
+        repo_names (list): The names of the repositories.
+        """
+        missing = [repo_name for repo_name in dict.fromkeys(repo_names) if repo_name not in self._repo_id]
+        if not missing:
+            return
+
+        repositories = await get_repositories(self.org_or_user, missing, "databaseId", headers=self.headers)
+        for repo_name, repository in repositories.items():
+            self._repo_id[repo_name] = repository["databaseId"]
+
+    async def get_public_key(self, url):
         """
         Get the public key for a repository or environment to use for encryption.
 
@@ -59,9 +82,9 @@ class GithubSecretsClient:
         Raises:
         ValueError: If the public key cannot be retrieved.
         """
-        response = requests.get(url, headers=self.headers)
+        response = await request("GET", url, headers=self.headers)
         if response.status_code == 200:
-            return response.json()
+            return json_loads(response.content)
         else:
             raise ValueError(f"Failed to get public key from '{url}'. Status code: {response.status_code}")
 
@@ -75,12 +98,46 @@ class GithubSecretsClient:
 
 
         """
-        public_key = public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder())
-        sealed_box = public.SealedBox(public_key)
+        return self._seal(self._box_for(public_key), secret_value)
+
+    def _box_for(self, public_key: str) -> public.SealedBox:
+        """
+        Build a SealedBox for a public key. Decoding the key is the costly part of
+        encryption, so one box is built per key and reused for all its secrets.
+
+        Parameters:
+        public_key (str): The Base64 encoded public key.
+        """
+        return public.SealedBox(public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder()))
+
+    def _seal(self, sealed_box: public.SealedBox, secret_value: str) -> str:
+        """
+        Encrypt a Unicode string using a SealedBox.
+
+        Parameters:
+        sealed_box (SealedBox): The SealedBox built from the public key.
+        secret_value (str): The secret value to encrypt.
+        """
         encrypted = sealed_box.encrypt(secret_value.encode("utf-8"))
         return b64encode(encrypted).decode("utf-8")
 
-    def add_secrets(self, repo_name, secret_name, secret_value, environment_name=None):
+    async def get_secrets_public_key(self, repo_name, environment_name=None):
+        """
+        Get the public key used to encrypt the secrets of a repository or environment.
+
+        Parameters:
+        repo_name (str): The name of the repository.
+        environment_name (str, optional): The name of the environment. Defaults to None.
+
+        Returns:
+        dict: The public key data.
+        """
+        if environment_name:
+            repository_id = await self.get_repository_details(repo_name)
+            return await self.get_public_key(f"/repositories/{repository_id}/environments/{environment_name}/secrets/public-key")
+        return await self.get_public_key(f"/repos/{self.org_or_user}/{repo_name}/actions/secrets/public-key")
+
+    async def add_secrets(self, repo_name, secret_name, secret_value, environment_name=None):
         """
         Add a secret to a repository or environment.
 
@@ -90,22 +147,53 @@ class GithubSecretsClient:
         secret_value (str): The value of the secret.
         environment_name (str, optional): The name of the environment. Defaults to None.
         """
+        public_key_data = await self.get_secrets_public_key(repo_name, environment_name)
+        sealed_box = self._box_for(public_key_data.get('key'))
+        await self._put_secret(repo_name, secret_name, secret_value, sealed_box, public_key_data.get("key_id"), environment_name)
+
+    async def _add_secrets_with_key(self, repo_name, secrets, environment_name=None):
+        """
+        Add several secrets to a repository or environment, fetching its public key and
+        building its SealedBox once.
+
+        Parameters:
+        repo_name (str): The name of the repository.
+        secrets (list): A list of dictionaries containing the keys "secret_name" and "secret_value".
+        environment_name (str, optional): The name of the environment. Defaults to None.
+        """
+        if not secrets:
+            return
+        public_key_data = await self.get_secrets_public_key(repo_name, environment_name)
+        sealed_box = self._box_for(public_key_data.get('key'))
+        await asyncio.gather(*[
+            self._put_secret(repo_name, secret.get("secret_name"), secret.get("secret_value"), sealed_box, public_key_data.get("key_id"), environment_name)
+            for secret in secrets
+        ])
+
+    async def _put_secret(self, repo_name, secret_name, secret_value, sealed_box, public_key_id, environment_name=None):
+        """
+        Encrypt a secret with the SealedBox of a previously fetched public key and add it to a repository or environment.
+
+        Parameters:
+        repo_name (str): The name of the repository.
+        secret_name (str): The name of the secret.
+        secret_value (str): The value of the secret.
+        sealed_box (SealedBox): The SealedBox built from the public key of the repository or environment.
+        public_key_id (str): The ID of the public key.
+        environment_name (str, optional): The name of the environment. Defaults to None.
+        """
         if environment_name:
-            url = f"https://api.github.com/repos/{self.org_or_user}/{repo_name}/environments/{environment_name}/secrets/{secret_name}"
-            public_key_data = self.get_public_key(f"https://api.github.com/repositories/{self.get_repository_details(repo_name)}/environments/{environment_name}/secrets/public-key")
+            url = f"/repos/{self.org_or_user}/{repo_name}/environments/{environment_name}/secrets/{secret_name}"
         else:
-            url = f"https://api.github.com/repos/{self.org_or_user}/{repo_name}/actions/secrets/{secret_name}"
-            public_key_data = self.get_public_key(f"https://api.github.com/repos/{self.org_or_user}/{repo_name}/actions/secrets/public-key")
-        
-        public_key = public_key_data.get('key')
-        public_key_id = public_key_data.get("key_id") 
-        encrypted_value = self.encrypt(public_key, secret_value)
+            url = f"/repos/{self.org_or_user}/{repo_name}/actions/secrets/{secret_name}"
+
+        encrypted_value = self._seal(sealed_box, secret_value)
         encrypted_secret = {
             "encrypted_value": encrypted_value,
             "key_id": str(public_key_id),
         }
         
-        response = requests.put(url, headers=self.headers, json=encrypted_secret)
+        response = await request("PUT", url, headers=self.headers, json=encrypted_secret)
         if response.status_code in [204, 201]:
             if environment_name:
                 logging.info(f"Secret '{secret_name}' added to environment '{environment_name}' successfully.")
@@ -118,38 +206,68 @@ class GithubSecretsClient:
                 logging.error(f"Failed to add secret '{secret_name}' to repository '{repo_name}'. Status code: {response.status_code}")
             logging.error(response.text)
 
+    def add_secrets_sync(self, *args, **kwargs):
+        """
+        Synchronous wrapper around add_secrets.
+        """
+        return run_sync(self.add_secrets(*args, **kwargs))
 
-    def add_secrets_to_repos(self, repositories):
+    async def add_secrets_to_repos(self, repositories):
         """
-        Add secrets to repositories.
+        Add secrets to repositories. The public key of each repository is fetched once
+        and the secrets are added concurrently.
 
         Parameters:
         repositories (list): A list of dictionaries, where each dictionary represents a repository and contains the keys "repo_name" and "repo_secrets". The value of "repo_secrets" is a list of dictionaries, where each dictionary represents a secret and contains the keys "secret_name" and "secret_value".
         """
-        for repo in repositories:
-            repo_name = repo.get("repo_name")
-            repo_secrets = repo.get("repo_secrets", [])
-            for secret in repo_secrets:
-                secret_name = secret.get("secret_name")
-                secret_value = secret.get("secret_value")
-                self.add_secrets(repo_name, secret_name, secret_value)
+        await asyncio.gather(*[
+            self._add_secrets_with_key(repo.get("repo_name"), repo.get("repo_secrets", []))
+            for repo in repositories
+        ])
+
+    def add_secrets_to_repos_sync(self, *args, **kwargs):
+        """
+        Synchronous wrapper around add_secrets_to_repos.
+        """
+        return run_sync(self.add_secrets_to_repos(*args, **kwargs))
 
-    def add_secrets_to_envs(self, repositories):
+    async def add_secrets_to_envs(self, repositories):
         """
-        Add secrets to the environments of repositories.
+        Add secrets to the environments of repositories. The repository IDs are looked up
+        in one GraphQL query, the public key of each environment is fetched once and the
+        secrets are added concurrently.
 
         Parameters:
         repositories (list): A list of dictionaries, where each dictionary represents a repository and contains the keys "repo_name" and "environments". The value of "environments" is a list of dictionaries, where each dictionary represents an environment and contains the keys "environment_name" and "secrets". The value of "secrets" is a list of dictionaries, where each dictionary represents a secret and contains the keys "secret_name" and "secret_value".
         """
-        for repo in repositories:
-            repo_name = repo.get("repo_name")
-            repository_id = self.get_repository_details(repo_name)
-            environments = repo.get("environments", [])
-            
-            for environment in environments:
-                environment_name = environment["environment_name"]
-                secrets = environment.get("secrets", [])
-                for secret in secrets:
-                    secret_name = secret.get("secret_name")
-                    secret_value = secret.get("secret_value")
-                    self.add_secrets(repo_name,  secret_name, secret_value, environment_name)
\ No newline at end of file
+        await self.get_repository_ids([
+            repo.get("repo_name") for repo in repositories
+            if any(environment.get("secrets") for environment in repo.get("environments", []))
+        ])
+        await asyncio.gather(*[self._add_env_secrets(repo) for repo in repositories])
+
+    async def _add_env_secrets(self, repo):
+        """
+        Add secrets to the environments of a single repository.
+
+        Parameters:
+        repo (dict): A repository as described in add_secrets_to_envs.
+        """
+        repo_name = repo.get("repo_name")
+        environments = repo.get("environments", [])
+        if not any(environment.get("secrets") for environment in environments):
+            return
+
+        # Falls back to REST if the ID was not resolved by get_repository_ids, before
+        # fanning out so the environments share it
+        await self.get_repository_details(repo_name)
+        await asyncio.gather(*[
+            self._add_secrets_with_key(repo_name, environment.get("secrets", []), environment["environment_name"])
+            for environment in environments
+        ])
+
+    def add_secrets_to_envs_sync(self, *args, **kwargs):
+        """
+        Synchronous wrapper around add_secrets_to_envs.
+        """
+        return run_sync(self.add_secrets_to_envs(*args, **kwargs))
\ No newline at end of file
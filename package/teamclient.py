@@ -1,22 +1,95 @@
-import requests
+import asyncio
+import itertools
 import json
 import os
 import logging
-from .utils import get_headers
+import re
+import unicodedata
+import tempfile
+import httpx
+from .asyncclient import GRAPHQL_BATCH_SIZE, gather_limited, get_repositories, graphql, is_rate_limited, request, run_sync
+from .utils import get_headers, json_loads
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# GraphQL repository permissions matching the REST API's team permissions
+GRAPHQL_PERMISSIONS = {"pull": "READ", "triage": "TRIAGE", "push": "WRITE", "maintain": "MAINTAIN", "admin": "ADMIN"}
+# Validation errors GitHub answers a request creating a team that already exists with
+TEAM_EXISTS_MESSAGES = re.compile(r"already exists|must be unique", re.IGNORECASE)
+
+def team_slug(team_name):
+    """
+    Derive the slug GitHub gives a team name, for teams whose actual slug is not known.
+    Accents are dropped and every run of other characters becomes a single hyphen.
+    
+    Parameters:
+    team_name (str): The name of the team.
+    
+    Returns:
+    str: The slug of the team.
+    """
+    ascii_name = unicodedata.normalize("NFKD", team_name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9_]+", "-", ascii_name.lower()).strip("-")
 
 class GithubTeamClient:
-    def __init__(self, github_token):
+    def __init__(self, github_token, max_concurrency=10, etag_cache_path=None):
+        """
+        Initialize the GithubTeamClient with one or more GitHub tokens.
+
+        When several tokens are given, requests rotate between them so each token's
+        rate limit adds to the budget, skipping tokens whose rate limit is used up.
+        
+        Parameters:
+        github_token (str or list): The GitHub token, or a list of GitHub tokens, used for authentication.
+        max_concurrency (int, optional): The maximum number of teams handled at the same time. Defaults to 10.
+        etag_cache_path (str, optional): A JSON file the ETags of team lookups are kept in between runs. Defaults to None.
+        
+        Raises:
+        ValueError: If no token is given.
+        """
+        self.github_tokens = list(github_token) if isinstance(github_token, (list, tuple)) else [github_token]
+        if not self.github_tokens or not all(self.github_tokens):
+            raise ValueError("A GitHub token is required. Set GITHUB_TOKEN or pass one or more tokens.")
+        self.github_token = self.github_tokens[0]
+        self._token_headers = [get_headers(token) for token in self.github_tokens]
+        self._token_iter = itertools.cycle(self._token_headers)
+        self.max_concurrency = max_concurrency
+        self.etag_cache_path = etag_cache_path
+        self._etag_cache = {}
+        self._etag_cache_changed = False
+        # (organization, team name or repository name) -> GraphQL node ID
+        self._team_ids = {}
+        self._repo_ids = {}
+        # (organization, team name) -> whether the team exists, as found during this run
+        self._known_teams = {}
+        # (organization, team name) -> slug of the team, as reported by GitHub
+        self._team_slugs = {}
+        if etag_cache_path and os.path.exists(etag_cache_path):
+            try:
+                with open(etag_cache_path) as f:
+                    self._etag_cache = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable ETag cache '%s': %s", etag_cache_path, e)
+
+    def _next_headers(self, resource="core"):
         """
-        Initialize the GithubTeamClient with a GitHub token.
+        Get the headers for the next request, rotating through the tokens. It is passed
+        to request() as the headers, so every retry of a request picks a token again.
         
         Parameters:
-        github_token (str): The GitHub token used for authentication.
+        resource (str, optional): The rate limit resource the request counts against. Defaults to "core".
+        
+        Returns:
+        dict: The headers of the first token in the rotation whose rate limit is not used up,
+        or of the next token if all of them are.
         """
-        self.github_token = github_token
+        for _ in range(len(self._token_headers)):
+            headers = next(self._token_iter)
+            if not is_rate_limited(headers["Authorization"], resource):
+                return headers
+        return next(self._token_iter)
 
-    def create_team(self, org_or_user, team_data):
+    async def create_team(self, org_or_user, team_data):
         """
         Create a team for a specified organization or user.
         
@@ -24,132 +97,470 @@ class GithubTeamClient:
         org_or_user (str): The name of the organization or user.
         team_data (dict): The data for the team to be created.
         """
-        url = f"https://api.github.com/orgs/{org_or_user}/teams"
-        headers = get_headers(self.github_token)
-
-        # Function to check if a team already exists
-        def team_exists(team_name):
-            """
-            Check if a team already exists.
-            
-            Parameters:
-            team_name (str): The name of the team.
-            
-            Returns:
-            bool: True if the team exists, False otherwise.
-            """
-            response = requests.get(f"{url}/{team_name}", headers=headers)
-            return response.status_code == 200
-
         team_name = team_data['team_name']
-        team_description = team_data['description']
-        team_permission = team_data['permission']
 
-        if team_exists(team_name):
-            logging.info(f"Team '{team_name}' already exists. Skipping creation.")
+        if await self.team_exists(org_or_user, team_name):
+            logger.info("Team '%s' already exists. Skipping creation.", team_name)
         else:
-            team_payload = {
-                "name": team_name,
-                "description": team_description,
-                "privacy": "closed",
-                "permission": team_permission,
-            }
+            if await self._post_team(org_or_user, f"/orgs/{org_or_user}/teams", self._team_payload(team_data)):
+                self._known_teams[(org_or_user, team_name)] = True
+        await self._save_etag_cache()
 
-            response = requests.post(url, headers=headers, json=team_payload)
+    async def team_exists(self, org_or_user, team_name):
+        """
+        Check if a team already exists.
 
-            if response.status_code == 201:
-                logging.info(f"Team '{team_name}' created successfully.")
-            else:
-                logging.error(f"Failed to create Team '{team_name}'. Status code: {response.status_code}")
-                logging.error(response.text)
+        The ETag of the previous lookup is sent along, so a team that has not changed
+        is answered with a 304 which does not count against the rate limit. The answer
+        is remembered, so each team is looked up at most once per client. The ETags are
+        written to etag_cache_path once create_team is done.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        team_name (str): The name of the team.
+        
+        Returns:
+        bool: True if the team exists, False otherwise.
+        """
+        key = (org_or_user, team_name)
+        if key in self._known_teams:
+            return self._known_teams[key]
+
+        url = f"/orgs/{org_or_user}/teams/{self._team_slug(org_or_user, team_name)}"
+        etag = self._etag_cache.get(url)
+
+        def headers(resource):
+            token_headers = self._next_headers(resource)
+            return {**token_headers, "If-None-Match": etag} if etag else token_headers
 
-    def create_teams(self, org_or_user, teams_data):
+        response = await request("GET", url, headers=headers, status_only=(200, 304, 404))
+        if response.status_code == 200 and "ETag" in response.headers:
+            self._etag_cache[url] = response.headers["ETag"]
+            self._etag_cache_changed = True
+        elif response.status_code == 404 and self._etag_cache.pop(url, None) is not None:
+            self._etag_cache_changed = True
+        if response.status_code in (200, 304, 404):
+            self._known_teams[key] = response.status_code != 404
+        return response.status_code in (200, 304)
+
+    async def _save_etag_cache(self):
+        """
+        Write the ETags of team lookups to etag_cache_path, if one is set and they changed.
+        The file is written in a worker thread so the event loop is not blocked.
         """
-        Create multiple teams for a specified organization or user.
+        if not self.etag_cache_path or not self._etag_cache_changed:
+            return
+        self._etag_cache_changed = False
+        await asyncio.to_thread(self._write_etag_cache, dict(self._etag_cache))
+
+    def _write_etag_cache(self, etag_cache):
+        """
+        Write ETags of team lookups to etag_cache_path. They are written to a temporary
+        file next to it first, which then replaces the cache file in one step, so a
+        crash or a concurrent write never leaves a partially written cache behind.
+        
+        Parameters:
+        etag_cache (dict): The ETags keyed by the URL of the team.
+        """
+        directory = os.path.dirname(os.path.abspath(self.etag_cache_path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as f:
+            temp_path = f.name
+            try:
+                json.dump(etag_cache, f)
+            except BaseException:
+                f.close()
+                os.unlink(temp_path)
+                raise
+        os.replace(temp_path, self.etag_cache_path)
+
+    def _team_payload(self, team_data):
+        """
+        Build the payload of the request creating a team.
+        
+        Parameters:
+        team_data (dict): The data for the team to be created.
+        
+        Returns:
+        dict: The payload for the team.
+        """
+        return {
+            "name": team_data['team_name'],
+            "description": team_data['description'],
+            "privacy": "closed",
+            "permission": team_data['permission'],
+        }
+
+    def _team_slug(self, org_or_user, team_name):
+        """
+        Get the slug of a team, preferring the one GitHub reported when the team was
+        listed or created over the one derived from its name.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        team_name (str): The name of the team.
+        
+        Returns:
+        str: The slug of the team.
+        """
+        slug = self._team_slugs.get((org_or_user, team_name))
+        return slug if slug is not None else team_slug(team_name)
+
+    async def _post_team(self, org_or_user, url, team_payload):
+        """
+        Send the request creating a team, without checking whether it exists. A team
+        that turns out to exist already is skipped, so the request is safe to repeat.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        url (str): The URL of the organization's teams.
+        team_payload (dict): The payload for the team to be created.
+        
+        Returns:
+        bool: True if the team was created or already exists, False otherwise.
+        """
+        team_name = team_payload["name"]
+        response = await request("POST", url, headers=self._next_headers, json=team_payload)
+
+        if response.status_code == 201:
+            slug = json_loads(response.content).get("slug")
+            if slug:
+                self._team_slugs[(org_or_user, team_name)] = slug
+            logger.info("Team '%s' created successfully.", team_name)
+            return True
+        if response.status_code == 422 and TEAM_EXISTS_MESSAGES.search(response.text):
+            logger.info("Team '%s' already exists. Skipping creation.", team_name)
+            return True
+        logger.error("Failed to create Team '%s'. Status code: %s", team_name, response.status_code)
+        logger.error("%s", response.text)
+        return False
+
+    def create_team_sync(self, *args, **kwargs):
+        """
+        Synchronous wrapper around create_team.
+        """
+        return run_sync(self.create_team(*args, **kwargs))
+
+    async def create_teams(self, org_or_user, teams_data):
+        """
+        Create multiple teams for a specified organization or user. The existing teams are
+        looked up with GraphQL up front, and up to max_concurrency missing teams are created concurrently.
+        If the lookup fails, every team is posted and the ones that exist are skipped.
         
         Parameters:
         org_or_user (str): The name of the organization or user.
         teams_data (dict): The data containing the teams to be created.
         """
+        existing_teams = await self._fetch_existing_team_slugs(org_or_user)
+        if existing_teams is None:
+            # Creating a team that exists is skipped, so without the listing every team is simply posted
+            existing_teams = frozenset()
+
+        # The requests are built up front, so the concurrent tasks only send them
+        teams_url = f"/orgs/{org_or_user}/teams"
+        plan = []
+        planned = set()
         for team_data in teams_data.get('teams', []):
-            self.create_team(org_or_user, team_data)
+            team_name = team_data['team_name']
+            slug = self._team_slug(org_or_user, team_name)
+            if team_name in existing_teams or slug in existing_teams:
+                self._known_teams[(org_or_user, team_name)] = True
+                logger.info("Team '%s' already exists. Skipping creation.", team_name)
+                continue
+            # Teams listed more than once are created once
+            if slug in planned:
+                continue
+            planned.add(slug)
+            plan.append((teams_url, self._team_payload(team_data)))
+        results = await gather_limited([self._post_team(org_or_user, url, team_payload) for url, team_payload in plan], self.max_concurrency)
+        for (_, team_payload), exists in zip(plan, results):
+            if exists:
+                self._known_teams[(org_or_user, team_payload["name"])] = True
 
-    def associate_teams_idp(self, org_or_user, teams_data):
+    def create_teams_sync(self, *args, **kwargs):
+        """
+        Synchronous wrapper around create_teams.
         """
-        Associate teams with Identity Provider (IDP) groups.
+        return run_sync(self.create_teams(*args, **kwargs))
+
+    async def _fetch_existing_team_slugs(self, org_or_user):
+        """
+        Get the names and slugs of all teams in an organization using the GraphQL API,
+        falling back to the REST API if the query fails.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        
+        Returns:
+        set: The names and slugs of the existing teams, or None if they could not be retrieved.
+        """
+        query = """
+        query($org: String!, $after: String) {
+            organization(login: $org) {
+                teams(first: 100, after: $after) {
+                    nodes { name slug }
+                    pageInfo { endCursor hasNextPage }
+                }
+            }
+        }
+        """
+        existing_teams = set()
+        after = None
+
+        while True:
+            data = await graphql(query, {"org": org_or_user, "after": after}, headers=self._next_headers)
+            if data is None or data.get("organization") is None:
+                return await self._list_team_slugs(org_or_user)
+            teams = data["organization"]["teams"]
+            for team in teams["nodes"]:
+                self._team_slugs[(org_or_user, team["name"])] = team["slug"]
+                existing_teams.update((team["name"], team["slug"]))
+            if not teams["pageInfo"]["hasNextPage"]:
+                return existing_teams
+            after = teams["pageInfo"]["endCursor"]
+
+    async def _list_team_slugs(self, org_or_user):
+        """
+        Get the names and slugs of all teams in an organization using the REST API.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        
+        Returns:
+        set: The names and slugs of the existing teams, or None if they could not be retrieved.
+        """
+        existing_teams = set()
+        try:
+            async for team in self._paginate(f"/orgs/{org_or_user}/teams"):
+                self._team_slugs[(org_or_user, team["name"])] = team["slug"]
+                existing_teams.update((team["name"], team["slug"]))
+        except httpx.HTTPStatusError:
+            return None
+        return existing_teams
+
+    async def _paginate(self, url):
+        """
+        Get the items of a paginated REST API listing, 100 per page, following the
+        "next" links of the Link header.
+        
+        Parameters:
+        url (str): The URL of the listing.
+        
+        Yields:
+        dict: The items of the listing, in order.
+        
+        Raises:
+        httpx.HTTPStatusError: If a page cannot be retrieved.
+        """
+        params = {"per_page": 100}
+        while url:
+            response = await request("GET", url, headers=self._next_headers, params=params)
+            if response.status_code != 200:
+                logger.error("Failed to list '%s'. Status code: %s", url, response.status_code)
+                response.raise_for_status()
+            for item in json_loads(response.content):
+                yield item
+            # The next link already carries the query parameters
+            url = response.links.get("next", {}).get("url")
+            params = None
+
+    async def associate_teams_idp(self, org_or_user, teams_data):
+        """
+        Associate teams with Identity Provider (IDP) groups. Up to max_concurrency teams are handled concurrently.
         
         Parameters:
         org_or_user (str): The name of the organization or user.
         teams_data (dict): The data containing the teams and their associated IDP groups.
         """
-        headers = get_headers(self.github_token)
-        teams = teams_data.get('teams', [])
+        plan = self._plan_idp_connections(org_or_user, teams_data.get('teams', []))
+        tasks = [self._patch_idp_connections(*team_plan) for team_plan in plan]
+        await gather_limited(tasks, self.max_concurrency)
+
+    def associate_teams_idp_sync(self, *args, **kwargs):
+        """
+        Synchronous wrapper around associate_teams_idp.
+        """
+        return run_sync(self.associate_teams_idp(*args, **kwargs))
 
-        # Iterate through teams object
+    def _plan_idp_connections(self, org_or_user, teams):
+        """
+        Build the requests associating teams with their Identity Provider (IDP) groups.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        teams (list): The teams and their associated IDP groups.
+        
+        Returns:
+        list: A list of (team_name, idp_connections_url, idp_connection_payload) tuples.
+        """
+        teams_url = f"/orgs/{org_or_user}/teams"
+        plan = []
         for team_info in teams:
             team_name = team_info.get('team_name')
-            team_description = team_info.get('description', '')
-
-            # Check if the team has associated groups for IDP connections
             groups = team_info.get('groups', [])
-            for group in groups:
-                group_id = group.get('group_id')
-                group_name = group.get('group_name')
-                group_description = group.get('group_description')
-
-                # Define the URL for creating teams and IDP connections
-                idp_connections_url = f"https://api.github.com/orgs/{org_or_user}/teams/{team_name}/team-sync/group-mappings"
-                logging.info(idp_connections_url)
-
-                # Create a dictionary with the IDP connection details
-                idp_connection_payload = {
-                    "groups": [
-                        {
-                        "group_id": group_id,
-                        "group_name": group_name,
-                        "group_description": group_description,
-                        }
-                    ]
-                }
+            if not groups:
+                continue
 
-                # Send a POST request to create the IDP connection
-                response = requests.patch(idp_connections_url, headers=headers, json=idp_connection_payload)
-                if response.status_code == 200:
-                    logging.info(f"IDP connection for group '{group_name}' created successfully for team '{team_name}'.")
-                else:
-                    logging.error(f"Failed to create IDP connection for group '{group_name}' for team '{team_name}'. Status code: {response.status_code}")
-                    logging.error(response.text)
+            # Define the URL for creating IDP connections
+            idp_connections_url = f"{teams_url}/{self._team_slug(org_or_user, team_name)}/team-sync/group-mappings"
+
+            # The mapping replaces the team's existing groups, so all of them are sent at once
+            idp_connection_payload = {
+                "groups": [
+                    {
+                    "group_id": group.get('group_id'),
+                    "group_name": group.get('group_name'),
+                    "group_description": group.get('group_description'),
+                    }
+                    for group in groups
+                ]
+            }
+            plan.append((team_name, idp_connections_url, idp_connection_payload))
+        return plan
+
+    async def _patch_idp_connections(self, team_name, idp_connections_url, idp_connection_payload):
+        """
+        Send the request associating a single team with its Identity Provider (IDP) groups.
+        
+        Parameters:
+        team_name (str): The name of the team.
+        idp_connections_url (str): The URL of the team's group mappings.
+        idp_connection_payload (dict): The groups to be associated with the team.
+        """
+        group_names = [group["group_name"] for group in idp_connection_payload["groups"]]
+        logger.debug("PATCH %s", idp_connections_url)
+
+        # Send a PATCH request to create the IDP connections
+        response = await request("PATCH", idp_connections_url, headers=self._next_headers, json=idp_connection_payload)
+        if response.status_code == 200:
+            logger.info("IDP connections for groups %s created successfully for team '%s'.", group_names, team_name)
+        else:
+            logger.error("Failed to create IDP connections for groups %s for team '%s'. Status code: %s", group_names, team_name, response.status_code)
+            logger.error("%s", response.text)
 
-    def add_repos_to_teams(self, org_or_user, teams_assoc_data):
+    async def add_repos_to_teams(self, org_or_user, teams_assoc_data):
         """
-        Add repositories to teams.
+        Add repositories to teams. Up to max_concurrency teams are handled concurrently.
         
         Parameters:
         org_or_user (str): The name of the organization or user.
         teams_assoc_data (dict): The data containing the teams and the repositories to be added.
         """
-        headers = get_headers(self.github_token)
         teams = teams_assoc_data.get("teams", [])
 
-        for team_assoc_data in teams:
-            team_name = team_assoc_data.get("team_name")
-            permission = team_assoc_data.get("permission")
-            repo_names = team_assoc_data.get("repo_names", [])
-
-            # Check if repo_names is not empty before making the API request
-            if repo_names:
-                for repo_name in repo_names:
-                    url = f'https://api.github.com/orgs/{org_or_user}/teams/{team_name}/repos/{org_or_user}/{repo_name}'
-                    logging.info(f"Trying to add '{repo_name}' to team '{team_name}' with URL: {url}")
-                    data = {
-                        'permission': permission
-                    }
-                    response = requests.put(url, headers=headers, json=data)
-                    response.raise_for_status()  # Raise an exception for HTTP errors
-            
+        # Repositories are added to a team one at a time, as GitHub handles concurrent
+        # writes to the same team poorly
+        tasks = [self._add_repos_to_team(org_or_user, team_assoc_data) for team_assoc_data in teams]
+        await gather_limited(tasks, self.max_concurrency)
+
+    def add_repos_to_teams_sync(self, *args, **kwargs):
+        """
+        Synchronous wrapper around add_repos_to_teams.
+        """
+        return run_sync(self.add_repos_to_teams(*args, **kwargs))
+
+    async def _add_repos_to_team(self, org_or_user, team_assoc_data):
+        """
+        Add repositories to a single team.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        team_assoc_data (dict): The team and the repositories to be added.
+        """
+        team_name = team_assoc_data.get("team_name")
+        permission = team_assoc_data.get("permission")
+        repo_names = team_assoc_data.get("repo_names", [])
+
+        if not repo_names:
+            return
+
+        # Built-in permissions are granted with batched GraphQL mutations, anything
+        # else (such as custom repository roles) and what they miss goes over REST
+        if permission in GRAPHQL_PERMISSIONS:
+            repo_names = await self._update_team_repositories(org_or_user, team_name, repo_names, permission)
+
+        team_repos_url = f"/orgs/{org_or_user}/teams/{self._team_slug(org_or_user, team_name)}/repos/{org_or_user}"
+        for repo_name in repo_names:
+            url = f"{team_repos_url}/{repo_name}"
+            logger.info("Trying to add '%s' to team '%s' with URL: %s", repo_name, team_name, url)
+            data = {
+                'permission': permission
+            }
+            response = await request("PUT", url, headers=self._next_headers, json=data, status_only=(204,))
             if response.status_code == 204:
-                logging.info(f"Repository added to team '{team_name}' with permission '{permission}'")
-                if repo_names:
-                    logging.info(f"Repository: '{repo_names}' associated with the team.")
+                logger.info("Repository '%s' added to team '%s' with permission '%s'", repo_name, team_name, permission)
             else:
-                logging.error(f"Error: Failed to add repository to team '{team_name}'")
\ No newline at end of file
+                logger.error("Error: Failed to add repository '%s' to team '%s'. Status code: %s", repo_name, team_name, response.status_code)
+                logger.error("%s", response.text)
+
+    async def _update_team_repositories(self, org_or_user, team_name, repo_names, permission):
+        """
+        Give a team a permission on several repositories using batched GraphQL mutations.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        team_name (str): The name of the team.
+        repo_names (list): The names of the repositories.
+        permission (str): The REST API permission, one of the keys of GRAPHQL_PERMISSIONS.
+        
+        Returns:
+        list: The repositories that could not be updated over GraphQL.
+        """
+        repo_names = list(dict.fromkeys(repo_names))
+        await self._get_node_ids(org_or_user, team_name, repo_names)
+        team_id = self._team_ids.get((org_or_user, team_name))
+        if team_id is None:
+            return repo_names
+
+        failed = [repo_name for repo_name in repo_names if (org_or_user, repo_name) not in self._repo_ids]
+        resolved = [repo_name for repo_name in repo_names if (org_or_user, repo_name) in self._repo_ids]
+        for start in range(0, len(resolved), GRAPHQL_BATCH_SIZE):
+            batch = resolved[start:start + GRAPHQL_BATCH_SIZE]
+            arguments = "".join(f", $r{i}: ID!" for i in range(len(batch)))
+            fields = " ".join(
+                f"r{i}: updateTeamsRepository(input: {{repositoryId: $r{i}, teamIds: [$team], permission: $permission}}) {{ clientMutationId }}"
+                for i in range(len(batch))
+            )
+            variables = {
+                "team": team_id,
+                "permission": GRAPHQL_PERMISSIONS[permission],
+                **{f"r{i}": self._repo_ids[(org_or_user, repo_name)] for i, repo_name in enumerate(batch)},
+            }
+            data = await graphql(
+                f"mutation($team: ID!, $permission: RepositoryPermission!{arguments}) {{ {fields} }}",
+                variables,
+                headers=self._next_headers,
+            ) or {}
+            for i, repo_name in enumerate(batch):
+                if data.get(f"r{i}") is None:
+                    failed.append(repo_name)
+                else:
+                    logger.info("Repository '%s' added to team '%s' with permission '%s'", repo_name, team_name, permission)
+        return failed
+
+    async def _get_node_ids(self, org_or_user, team_name, repo_names):
+        """
+        Look up the GraphQL node IDs of a team and its repositories. The repositories are
+        looked up in batches alongside the team. IDs that were looked up before are not
+        requested again.
+        
+        Parameters:
+        org_or_user (str): The name of the organization or user.
+        team_name (str): The name of the team.
+        repo_names (list): The names of the repositories.
+        """
+        missing = [repo_name for repo_name in repo_names if (org_or_user, repo_name) not in self._repo_ids]
+        lookups = [get_repositories(org_or_user, missing, "id", headers=self._next_headers)]
+        if (org_or_user, team_name) not in self._team_ids:
+            lookups.append(graphql(
+                "query($org: String!, $slug: String!) { organization(login: $org) { team(slug: $slug) { id } } }",
+                {"org": org_or_user, "slug": self._team_slug(org_or_user, team_name)},
+                headers=self._next_headers,
+            ))
+
+        repositories, *team_data = await asyncio.gather(*lookups)
+        for repo_name, repository in repositories.items():
+            self._repo_ids[(org_or_user, repo_name)] = repository["id"]
+        if team_data and team_data[0] is not None:
+            team = (team_data[0].get("organization") or {}).get("team")
+            if team is not None:
+                self._team_ids[(org_or_user, team_name)] = team["id"]
@@ -1,16 +1,41 @@
 import os
+from functools import lru_cache
+from types import MappingProxyType
 
-def load_env_vars():
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    import json
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+ENV_VARS = ['GITHUB_TOKEN', 'ORG_OR_USER', 'AZURE_STORAGE_ACCOUNT_NAME', 'AZURE_STORAGE_CONTAINER_NAME', 'AZURE_TENANT_ID', 'AZURE_CLIENT_ID', 'AZURE_CLIENT_SECRET']
+
+def load_env_vars(var_names=None):
     """
     Load required environment variables into a dictionary.
+
+    Parameters:
+    var_names (list, optional): The names of the variables to load. Defaults to ENV_VARS.
     """
-    env_vars = ['GITHUB_TOKEN', 'ORG_OR_USER', 'AZURE_STORAGE_ACCOUNT_NAME', 'AZURE_STORAGE_CONTAINER_NAME', 'AZURE_TENANT_ID', 'AZURE_CLIENT_ID', 'AZURE_CLIENT_SECRET']
-    return {var: os.environ.get(var) for var in env_vars}
+    getter = os.environ.get
+    return {var: getter(var) for var in (var_names or ENV_VARS)}
 
+@lru_cache(maxsize=16)
 def get_headers(github_token):
-    github_token = os.environ.get('GITHUB_TOKEN')
-    return {
+    """
+    Get the headers for GitHub API requests made with a token. The result is cached
+    and read-only, so copy it before adding headers.
+
+    Parameters:
+    github_token (str): The GitHub token used for authentication.
+    """
+    return MappingProxyType({
         "Authorization": f"Bearer {github_token}",
         "Accept": "application/vnd.github.v3+json",
         "X-GitHub-Api-Version": "2022-11-28",
-    }
\ No newline at end of file
+    })
\ No newline at end of file